@@ -0,0 +1,348 @@
+"""Shared AWS scanning logic for the missing-tags scripts"""
+import aioboto3
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from aiobotocore.config import AioConfig
+from botocore.exceptions import BotoCoreError, ClientError
+from collections import namedtuple
+from contextlib import AsyncExitStack
+from functools import lru_cache
+from pathlib import Path
+
+SESSION = aioboto3.Session()
+
+# One resource that lacks required tags; missing is a tuple in required_tags order
+ResourceRecord = namedtuple('ResourceRecord', 'account region resource resource_id arn missing')
+
+# Adaptive retries rate-limit on throttling instead of failing the call, the
+# pool covers every concurrent request to one endpoint, and idle connections
+# stay open long enough to be reused by the next call in the region
+CLIENT_CONFIG = AioConfig(
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+    connector_args={'keepalive_timeout': 60}
+)
+
+# Error codes that mean "slow down" rather than "this call cannot succeed"
+THROTTLING_ERROR_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException',
+    'RequestLimitExceeded', 'TooManyRequestsException', 'SlowDown'
+}
+MAX_THROTTLE_RETRIES = 3
+
+# Clients are created once per (service, region) and closed when the
+# calling script exits CLIENT_STACK
+CLIENT_STACK = AsyncExitStack()
+CLIENTS = {}
+
+CACHE_DIR = Path.home() / '.cache' / 'aws-missing-tags'
+CACHE_TTL = 24 * 60 * 60  # Regions and account ID change on the order of months
+
+async def cache_path(name):
+    """Path of a cache file for the resolved credentials, or None without credentials.
+    
+    Keyed on a hash of the access key rather than the profile name, so switching
+    accounts through environment or exported credentials never reuses another
+    account's data.
+    """
+    credentials = await SESSION.get_credentials()
+    if credentials is None:
+        return None
+    access_key = (await credentials.get_frozen_credentials()).access_key
+    identity = hashlib.sha256(access_key.encode()).hexdigest()[:16]
+    return CACHE_DIR / f"{identity}_{name}.json"
+
+async def read_cache(name):
+    """Return cached data for the current credentials if it is still fresh"""
+    path = await cache_path(name)
+    if path is None:
+        return None
+    try:
+        if time.time() - path.stat().st_mtime < CACHE_TTL:
+            return json.loads(path.read_text())
+    except (OSError, ValueError):
+        pass
+    return None
+
+async def write_cache(name, data):
+    """Store data for the current credentials, ignoring an unwritable cache directory"""
+    path = await cache_path(name)
+    if path is None:
+        return
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data))
+    except OSError:
+        pass
+
+def client_for(service, region=None):
+    """Return an awaitable for the shared client of a service in a region"""
+    key = (service, region)
+    if key not in CLIENTS:
+        CLIENTS[key] = asyncio.ensure_future(
+            CLIENT_STACK.enter_async_context(SESSION.client(service, region_name=region, config=CLIENT_CONFIG))
+        )
+    return CLIENTS[key]
+
+async def resolve_credentials():
+    """Resolve credentials once on the shared session before fanning out.
+    
+    Otherwise every client created concurrently walks the provider chain
+    (config files, IMDS) on its own.
+    """
+    await SESSION.get_credentials()
+
+async def get_regions():
+    """Get names of the regions enabled for this account, cached between runs"""
+    regions = await read_cache('enabled_regions')
+    if regions is None:
+        # Regions that are not opted in only fail with AuthFailure, so skip them
+        ec2 = await client_for('ec2')
+        response = await ec2.describe_regions(
+            Filters=[{'Name': 'opt-in-status', 'Values': ['opt-in-not-required', 'opted-in']}]
+        )
+        regions = [r['RegionName'] for r in response['Regions']]
+        await write_cache('enabled_regions', regions)
+    return regions
+
+async def get_account_id():
+    """Get the caller's account ID, cached between runs"""
+    account_id = await read_cache('account')
+    if account_id is None:
+        sts = await client_for('sts')
+        account_id = (await sts.get_caller_identity())['Account']
+        await write_cache('account', account_id)
+    return account_id
+
+def load_required_tags():
+    """Load required tags from configuration file, plus a set for fast lookups"""
+    try:
+        with open('required_tags.txt', 'r') as f:
+            required_tags = [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        required_tags = ['Environment', 'Owner', 'Project']  # Default tags
+    return tuple(required_tags), frozenset(required_tags)
+
+def check_missing_tags(resource_tags, required_tags, required_set):
+    """Check which required tags are missing from resource, in required_tags order"""
+    if not resource_tags:
+        return required_tags
+    
+    missing_set = required_set - {tag['Key'] for tag in resource_tags}
+    if not missing_set:
+        return ()
+    return tuple(tag for tag in required_tags if tag in missing_set)
+
+@lru_cache(maxsize=None)
+def join_missing(missing_tags):
+    """Join missing tags for output; only a handful of distinct combinations occur"""
+    return ', '.join(missing_tags)
+
+async def paginate_all(client, operation, result_key, page_size, strict=False, **kwargs):
+    """Collect the items from every page of a paginated describe/list call.
+    
+    Pages are fetched one per paginate() call and resumed from the paginator's
+    resume token, so a throttled page is retried with exponential backoff (on top
+    of botocore's own retries) without re-fetching the pages before it. Any other
+    error is reported and yields the items fetched so far, so one failing API
+    does not discard the rest of the region. With strict=True the error is
+    raised instead, for callers that cannot use an incomplete result.
+    """
+    paginator = client.get_paginator(operation)
+    items = []
+    starting_token = None
+    attempt = 0
+    while True:
+        pages = paginator.paginate(
+            PaginationConfig={'PageSize': page_size, 'MaxItems': page_size, 'StartingToken': starting_token},
+            **kwargs
+        )
+        batch = []
+        try:
+            async for page in pages:
+                batch.extend(page.get(result_key, []))
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code in THROTTLING_ERROR_CODES and attempt < MAX_THROTTLE_RETRIES:
+                await asyncio.sleep(2 ** attempt)
+                attempt += 1
+                continue
+            if strict:
+                raise
+            print(f"Warning: {operation} failed in {client.meta.region_name}: {code}", file=sys.stderr)
+            return items
+        except BotoCoreError as e:
+            if strict:
+                raise
+            print(f"Warning: {operation} failed in {client.meta.region_name}: {e}", file=sys.stderr)
+            return items
+        
+        items.extend(batch)
+        attempt = 0
+        starting_token = pages.resume_token
+        if starting_token is None:
+            return items
+
+async def get_tag_map(tagging, resource_types):
+    """Map resource ARNs to their tags via the Resource Groups Tagging API.
+    
+    Returns None if the sweep did not complete: an ARN missing from a partial
+    map would otherwise be reported as untagged.
+    """
+    try:
+        mappings = await paginate_all(tagging, 'get_resources', 'ResourceTagMappingList', 100,
+                                      strict=True, ResourceTypeFilters=resource_types)
+    except (BotoCoreError, ClientError) as e:
+        print(f"Warning: get_resources failed in {tagging.meta.region_name}, skipping {', '.join(resource_types)}: {e}",
+              file=sys.stderr)
+        return None
+    return {mapping['ResourceARN']: mapping.get('Tags', []) for mapping in mappings}
+
+async def scan_region(region, account_id, required_tags, required_set):
+    """Find resources in a region that are missing required tags.
+    
+    An unexpected failure is reported and yields no records, so it costs only
+    this region rather than the whole run.
+    """
+    try:
+        return await find_region_records(region, account_id, required_tags, required_set)
+    except Exception as e:
+        print(f"Warning: {region}: {e!r}", file=sys.stderr)
+        return []
+
+async def scan_s3_buckets(account_id, required_tags, required_set):
+    """Find S3 buckets (global) that are missing required tags.
+    
+    An unexpected failure is reported and yields no records.
+    """
+    try:
+        return await find_s3_records(account_id, required_tags, required_set)
+    except Exception as e:
+        print(f"Warning: Global S3: {e!r}", file=sys.stderr)
+        return []
+
+async def find_region_records(region, account_id, required_tags, required_set):
+    """Collect the records for one region; see scan_region"""
+    records = []
+    ec2, lambda_client, rds, tagging = await asyncio.gather(
+        client_for('ec2', region),
+        client_for('lambda', region),
+        client_for('rds', region),
+        client_for('resourcegroupstaggingapi', region)
+    )
+    
+    # The describe/list calls are independent, so issue them concurrently.
+    # Page sizes are the maximum each API accepts to keep round trips low.
+    # Lambda and RDS tags come from one tagging API sweep rather than a
+    # call per resource; resources that were never tagged are absent
+    # from it, so the functions and instances are still listed here.
+    instances, volumes, vpcs, security_groups, subnets, functions, db_instances, tag_map = await asyncio.gather(
+        paginate_all(ec2, 'describe_instances', 'Reservations', 1000),
+        paginate_all(ec2, 'describe_volumes', 'Volumes', 500),
+        paginate_all(ec2, 'describe_vpcs', 'Vpcs', 1000),
+        paginate_all(ec2, 'describe_security_groups', 'SecurityGroups', 1000),
+        paginate_all(ec2, 'describe_subnets', 'Subnets', 1000),
+        paginate_all(lambda_client, 'list_functions', 'Functions', 50),
+        paginate_all(rds, 'describe_db_instances', 'DBInstances', 100),
+        get_tag_map(tagging, ['lambda:function', 'rds:db'])
+    )
+    
+    # EC2 Instances
+    for reservation in instances:
+        for instance in reservation['Instances']:
+            missing = check_missing_tags(instance.get('Tags', []), required_tags, required_set)
+            if missing:
+                records.append(ResourceRecord(account_id, region, 'EC2 Instance', instance['InstanceId'],
+                                              f"arn:aws:ec2:{region}:{account_id}:instance/{instance['InstanceId']}", missing))
+    
+    # EBS Volumes
+    for volume in volumes:
+        missing = check_missing_tags(volume.get('Tags', []), required_tags, required_set)
+        if missing:
+            records.append(ResourceRecord(account_id, region, 'EBS Volume', volume['VolumeId'],
+                                          f"arn:aws:ec2:{region}:{account_id}:volume/{volume['VolumeId']}", missing))
+    
+    # Lambda Functions and RDS Instances; skipped when the tag map is incomplete
+    if tag_map is not None:
+        for function in functions:
+            missing = check_missing_tags(tag_map.get(function['FunctionArn'], []), required_tags, required_set)
+            if missing:
+                records.append(ResourceRecord(account_id, region, 'Lambda Function', function['FunctionName'],
+                                              function['FunctionArn'], missing))
+        
+        for instance in db_instances:
+            missing = check_missing_tags(tag_map.get(instance['DBInstanceArn'], []), required_tags, required_set)
+            if missing:
+                records.append(ResourceRecord(account_id, region, 'RDS Instance', instance['DBInstanceIdentifier'],
+                                              instance['DBInstanceArn'], missing))
+    
+    # VPCs
+    for vpc in vpcs:
+        missing = check_missing_tags(vpc.get('Tags', []), required_tags, required_set)
+        if missing:
+            records.append(ResourceRecord(account_id, region, 'VPC', vpc['VpcId'],
+                                          f"arn:aws:ec2:{region}:{account_id}:vpc/{vpc['VpcId']}", missing))
+    
+    # Security Groups
+    for sg in security_groups:
+        missing = check_missing_tags(sg.get('Tags', []), required_tags, required_set)
+        if missing:
+            records.append(ResourceRecord(account_id, region, 'Security Group', sg['GroupId'],
+                                          f"arn:aws:ec2:{region}:{account_id}:security-group/{sg['GroupId']}", missing))
+    
+    # Subnets
+    for subnet in subnets:
+        missing = check_missing_tags(subnet.get('Tags', []), required_tags, required_set)
+        if missing:
+            records.append(ResourceRecord(account_id, region, 'Subnet', subnet['SubnetId'],
+                                          f"arn:aws:ec2:{region}:{account_id}:subnet/{subnet['SubnetId']}", missing))
+    
+    return records
+
+async def get_bucket_tags(s3, bucket_name):
+    """Get a bucket's tags: [] if it has none, None if they could not be read.
+    
+    Only NoSuchTagSet means the bucket is untagged. Throttling is retried with
+    exponential backoff; any other error is reported and the bucket is skipped
+    rather than counted as missing every tag.
+    """
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        try:
+            tags_response = await s3.get_bucket_tagging(Bucket=bucket_name)
+            return tags_response.get('TagSet', [])
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code == 'NoSuchTagSet':
+                return []
+            if code in THROTTLING_ERROR_CODES and attempt < MAX_THROTTLE_RETRIES:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            print(f"Warning: get_bucket_tagging failed for {bucket_name}: {code}", file=sys.stderr)
+            return None
+        except BotoCoreError as e:
+            print(f"Warning: get_bucket_tagging failed for {bucket_name}: {e}", file=sys.stderr)
+            return None
+
+async def find_s3_records(account_id, required_tags, required_set):
+    """Collect the records for S3 buckets; see scan_s3_buckets"""
+    records = []
+    s3 = await client_for('s3')
+    try:
+        buckets = await s3.list_buckets()
+    except (BotoCoreError, ClientError) as e:
+        print(f"Warning: list_buckets failed: {e}", file=sys.stderr)
+        return records
+    
+    for bucket in buckets['Buckets']:
+        tags = await get_bucket_tags(s3, bucket['Name'])
+        if tags is None:
+            continue
+        missing = check_missing_tags(tags, required_tags, required_set)
+        if missing:
+            records.append(ResourceRecord(account_id, 'Global', 'S3 Bucket', bucket['Name'],
+                                          f"arn:aws:s3:::{bucket['Name']}", missing))
+    
+    return records
@@ -1,71 +1,89 @@
 #!/usr/bin/env python3
 import csv
+import os
+import sys
 from collections import Counter
 
 def analyze_csv(filename):
     """Analyze resources with missing tags CSV without pandas"""
-    resources = []
+    total = 0
+    resource_counts = Counter()
+    region_counts = Counter()
+    missing_tag_counts = Counter()
+    ec2_total = 0
+    ec2_preview = []  # First 5 EC2 instances
     
+    # Aggregate in a single streaming pass instead of loading every row
     try:
         with open(filename, 'r') as csvfile:
             reader = csv.DictReader(csvfile)
-            resources = list(reader)
+            has_missing_tags = 'Missing_Tags' in (reader.fieldnames or [])
+            for row in reader:
+                total += 1
+                resource_counts[row['Resource']] += 1
+                region_counts[row['Region']] += 1
+                if has_missing_tags:
+                    missing_tag_counts.update(tag.strip() for tag in row['Missing_Tags'].split(','))
+                if row['Resource'] == 'EC2 Instance':
+                    ec2_total += 1
+                    if len(ec2_preview) < 5:
+                        ec2_preview.append(row)
     except FileNotFoundError:
         print(f"File {filename} not found")
         return
     
-    if not resources:
+    if not total:
         print("No data found in CSV")
         return
     
-    print(f"Total resources with missing tags: {len(resources)}")
+    print(f"Total resources with missing tags: {total}")
     
     # Count by resource type
-    resource_counts = Counter(row['Resource'] for row in resources)
-    print("\nResources by type:")
-    for resource_type, count in resource_counts.most_common():
-        print(f"  {resource_type}: {count}")
+    lines = ["\nResources by type:"] + [f"  {resource_type}: {count}" for resource_type, count in resource_counts.most_common()]
+    sys.stdout.write("\n".join(lines) + "\n")
     
     # Count by region
-    region_counts = Counter(row['Region'] for row in resources)
-    print("\nResources by region:")
-    for region, count in region_counts.most_common():
-        print(f"  {region}: {count}")
+    lines = ["\nResources by region:"] + [f"  {region}: {count}" for region, count in region_counts.most_common()]
+    sys.stdout.write("\n".join(lines) + "\n")
     
     # Analyze missing tags
-    if 'Missing_Tags' in resources[0]:
-        all_missing_tags = []
-        for row in resources:
-            missing_tags = [tag.strip() for tag in row['Missing_Tags'].split(',')]
-            all_missing_tags.extend(missing_tags)
-        
-        missing_tag_counts = Counter(all_missing_tags)
-        print("\nMost commonly missing tags:")
-        for tag, count in missing_tag_counts.most_common():
-            print(f"  {tag}: {count} resources")
+    if has_missing_tags:
+        lines = ["\nMost commonly missing tags:"] + [f"  {tag}: {count} resources" for tag, count in missing_tag_counts.most_common()]
+        sys.stdout.write("\n".join(lines) + "\n")
     
-    # Filter EC2 instances
-    ec2_instances = [row for row in resources if row['Resource'] == 'EC2 Instance']
-    if ec2_instances:
-        print(f"\nEC2 Instances with missing tags ({len(ec2_instances)}):")
-        for instance in ec2_instances[:5]:  # Show first 5
+    # EC2 instances
+    if ec2_total:
+        print(f"\nEC2 Instances with missing tags ({ec2_total}):")
+        for instance in ec2_preview:
             missing_tags = instance.get('Missing_Tags', 'N/A')
             print(f"  {instance['Region']}: {instance['ARN']} (missing: {missing_tags})")
-        if len(ec2_instances) > 5:
-            print(f"  ... and {len(ec2_instances) - 5} more")
+        if ec2_total > 5:
+            print(f"  ... and {ec2_total - 5} more")
+
+def find_latest_csv(prefix, directory='output'):
+    """Find the most recently created CSV in directory whose name starts with prefix"""
+    latest_file = None
+    latest_ctime = -1
+    try:
+        # One directory read; no intermediate list of paths
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(prefix) and entry.name.endswith('.csv') and entry.is_file():
+                    ctime = entry.stat().st_ctime
+                    if ctime > latest_ctime:
+                        latest_file, latest_ctime = entry.path, ctime
+    except FileNotFoundError:
+        pass
+    return latest_file
 
 if __name__ == "__main__":
     # Find the latest CSV file
-    import os
-    import glob
-    
-    csv_files = glob.glob('output/missing_tags_resources_*.csv')
-    if not csv_files:
+    latest_file = find_latest_csv('missing_tags_resources_')
+    if latest_file is None:
         # Fallback to old naming convention
-        csv_files = glob.glob('output/untagged_resources_*.csv')
+        latest_file = find_latest_csv('untagged_resources_')
     
-    if csv_files:
-        latest_file = max(csv_files, key=os.path.getctime)
+    if latest_file:
         print(f"Analyzing: {latest_file}\n")
         analyze_csv(latest_file)
     else: